@@ -1,4 +1,4 @@
-import requests
+import time
 import json
 from datetime import datetime
 from http.server import HTTPServer, BaseHTTPRequestHandler
@@ -6,11 +6,25 @@ import urllib.parse
 import socket
 import uuid
 import base64
-from pyVmomi import vim
-from pyVim import connect
+import threading
+import sys
+import os
+import gzip
+import argparse
+import sqlite3
+import hmac
+import hashlib
+import re
 
-# Disable SSL warnings (use only in test environments)
-requests.packages.urllib3.disable_warnings()
+# Process start time, used to report cold start duration
+startup_started_at = time.perf_counter()
+
+# Heavy backend libraries (requests, pyVmomi, pyVim) are imported lazily so the
+# HTTP front end and login page can come up before they are loaded.
+requests = None
+vim = None
+connect = None
+backend_import_lock = threading.Lock()
 
 # Horizon server hostnames
 horizon_servers = ["https://HorizonVCS01FQDN", "https://HorizonVCS01FQDN"]
@@ -40,11 +54,84 @@ states_display_order = [
     "PROVISIONING", "CUSTOMIZING", "ERROR"
 ]
 
+# Pool filtering rules, applied before any per-pool work. Name patterns are
+# case-insensitive regular expressions; pool types are as reported by Horizon
+# (e.g. AUTOMATED, MANUAL, RDS). Empty include lists match every pool.
+pool_filter_rules = {
+    "include_name_patterns": [],
+    "exclude_name_patterns": [r"test"],
+    "include_types": [],
+    "exclude_types": []
+}
+
+# Pool grouping: None shows every pool, "prefix" rolls pools up by the first
+# capture group of prefix_pattern
+pool_grouping = {
+    "mode": None,
+    "prefix_pattern": r"^([^-_ ]+)"
+}
+
 # Session storage
 sessions = {}
 
+# Snapshot export/replay settings (set by run_server)
+snapshot_export_path = None
+replay_snapshot = None
+
+# Multi-instance settings (set by run_server when a shared store is configured)
+snapshot_store = None
+instance_id = str(uuid.uuid4())
+session_secret = None
+session_lifetime_seconds = 8 * 60 * 60
+
+# Function to lazily import requests
+def load_requests():
+    global requests
+    if requests is None:
+        with backend_import_lock:
+            if requests is None:
+                import requests as requests_module
+                # Disable SSL warnings (use only in test environments)
+                requests_module.packages.urllib3.disable_warnings()
+                requests = requests_module
+    return requests
+
+# Function to lazily import the vCenter stack (pyVmomi type loading is slow)
+def load_vcenter_stack():
+    global vim, connect
+    if vim is None or connect is None:
+        with backend_import_lock:
+            if vim is None or connect is None:
+                from pyVmomi import vim as vim_module
+                from pyVim import connect as connect_module
+                vim, connect = vim_module, connect_module
+    return vim, connect
+
+# Function to load backend libraries in the background after the server starts
+def warm_up_backends():
+    started_at = time.perf_counter()
+    try:
+        load_requests()
+        load_vcenter_stack()
+        print(f"Backend libraries loaded in {(time.perf_counter() - started_at) * 1000:.0f} ms")
+    except Exception as e:
+        print(f"Error loading backend libraries: {e}")
+
+# Function to get the peak resident set size of this process in MB
+def get_peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None  # Not available on Windows
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    if sys.platform == "darwin":
+        return rss / (1024 * 1024)
+    return rss / 1024
+
 # Function to connect to vCenter
 def connect_to_vcenter(host, user, password, port=443):
+    vim, connect = load_vcenter_stack()
     try:
         service_instance = connect.SmartConnect(
             host=host,
@@ -61,8 +148,64 @@ def connect_to_vcenter(host, user, password, port=443):
         print(f"Error connecting to vCenter: {e}")
         return None
 
-# Function to get cluster performance metrics
-def get_cluster_performance_metrics(service_instance, cluster_name):
+# Function to build cluster metrics from raw host properties. raw_cluster holds
+# the vCenter and cluster names and the per-host summary values, as captured in
+# snapshots, so live collection and replay share the same maths.
+def build_cluster_metrics(raw_cluster):
+    total_memory_usage_mb = 0
+    total_memory_capacity_mb = 0
+    total_cpu_usage_mhz = 0
+    total_cpu_capacity_mhz = 0
+    host_data = []
+
+    for host in raw_cluster["hosts"]:
+        host_memory_usage_mb = host["summary.quickStats.overallMemoryUsage"]
+        host_memory_capacity_mb = host["summary.hardware.memorySize"] / (1024 * 1024)  # Convert bytes to MB
+        host_cpu_usage_mhz = host["summary.quickStats.overallCpuUsage"]  # CPU usage in MHz
+        host_cpu_capacity_mhz = host["summary.hardware.cpuMhz"] * host["summary.hardware.numCpuCores"]  # Total CPU capacity in MHz
+
+        host_data.append({
+            "name": host["name"],
+            "used_memory_gb": host_memory_usage_mb / 1024,  # Convert MB to GB
+            "total_memory_gb": host_memory_capacity_mb / 1024,  # Convert MB to GB
+            "free_memory_gb": (host_memory_capacity_mb - host_memory_usage_mb) / 1024,  # Convert MB to GB
+            "cpu_usage_ghz": host_cpu_usage_mhz / 1000,  # Convert MHz to GHz
+            "cpu_capacity_ghz": host_cpu_capacity_mhz / 1000,  # Convert MHz to GHz
+            "cpu_free_ghz": (host_cpu_capacity_mhz - host_cpu_usage_mhz) / 1000  # Convert MHz to GHz
+        })
+
+        total_memory_usage_mb += host_memory_usage_mb
+        total_memory_capacity_mb += host_memory_capacity_mb
+        total_cpu_usage_mhz += host_cpu_usage_mhz
+        total_cpu_capacity_mhz += host_cpu_capacity_mhz
+
+    total_memory_usage_gb = total_memory_usage_mb / 1024  # Convert MB to GB
+    total_memory_capacity_gb = total_memory_capacity_mb / 1024  # Convert MB to GB
+    total_cpu_usage_ghz = total_cpu_usage_mhz / 1000  # Convert MHz to GHz
+    total_cpu_capacity_ghz = total_cpu_capacity_mhz / 1000  # Convert MHz to GHz
+
+    memory_load_percentage = (total_memory_usage_gb / total_memory_capacity_gb) * 100
+    cpu_load_percentage = (total_cpu_usage_ghz / total_cpu_capacity_ghz) * 100
+
+    return {
+        "vcenter_fqdn": raw_cluster["vcenter_fqdn"],  # vCenter FQDN
+        "vcenter_name": raw_cluster["vcenter_name"],  # vCenter name
+        "cluster_name": raw_cluster["cluster_name"],  # Cluster name
+        "hosts": host_data,
+        "total_used_gb": total_memory_usage_gb,
+        "total_capacity_gb": total_memory_capacity_gb,
+        "total_free_gb": total_memory_capacity_gb - total_memory_usage_gb,
+        "total_cpu_usage_ghz": total_cpu_usage_ghz,
+        "total_cpu_capacity_ghz": total_cpu_capacity_ghz,
+        "total_cpu_free_ghz": total_cpu_capacity_ghz - total_cpu_usage_ghz,
+        "memory_load_percentage": memory_load_percentage,
+        "cpu_load_percentage": cpu_load_percentage
+    }
+
+# Function to get cluster performance metrics; the raw host properties are
+# stored under raw_data["vcenter"][vcenter_id] if raw_data is given
+def get_cluster_performance_metrics(service_instance, cluster_name, raw_data=None, vcenter_id=None):
+    vim, _ = load_vcenter_stack()
     try:
         content = service_instance.RetrieveContent()
         cluster = None
@@ -73,56 +216,28 @@ def get_cluster_performance_metrics(service_instance, cluster_name):
                 break
 
         if cluster:
-            total_memory_usage_mb = 0
-            total_memory_capacity_mb = 0
-            total_cpu_usage_mhz = 0
-            total_cpu_capacity_mhz = 0
-            host_data = []
+            raw_cluster = {
+                "vcenter_fqdn": service_instance._stub.host,
+                "vcenter_name": service_instance.content.about.name,
+                "cluster_name": cluster.name,
+                "hosts": []
+            }
 
             for host in cluster.host:
                 summary = host.summary
-                host_memory_usage_mb = summary.quickStats.overallMemoryUsage
-                host_memory_capacity_mb = summary.hardware.memorySize / (1024 * 1024)  # Convert bytes to MB
-                host_cpu_usage_mhz = summary.quickStats.overallCpuUsage  # CPU usage in MHz
-                host_cpu_capacity_mhz = summary.hardware.cpuMhz * summary.hardware.numCpuCores  # Total CPU capacity in MHz
-
-                host_data.append({
+                raw_cluster["hosts"].append({
                     "name": host.name,
-                    "used_memory_gb": host_memory_usage_mb / 1024,  # Convert MB to GB
-                    "total_memory_gb": host_memory_capacity_mb / 1024,  # Convert MB to GB
-                    "free_memory_gb": (host_memory_capacity_mb - host_memory_usage_mb) / 1024,  # Convert MB to GB
-                    "cpu_usage_ghz": host_cpu_usage_mhz / 1000,  # Convert MHz to GHz
-                    "cpu_capacity_ghz": host_cpu_capacity_mhz / 1000,  # Convert MHz to GHz
-                    "cpu_free_ghz": (host_cpu_capacity_mhz - host_cpu_usage_mhz) / 1000  # Convert MHz to GHz
+                    "summary.quickStats.overallMemoryUsage": summary.quickStats.overallMemoryUsage,
+                    "summary.hardware.memorySize": summary.hardware.memorySize,
+                    "summary.quickStats.overallCpuUsage": summary.quickStats.overallCpuUsage,
+                    "summary.hardware.cpuMhz": summary.hardware.cpuMhz,
+                    "summary.hardware.numCpuCores": summary.hardware.numCpuCores
                 })
 
-                total_memory_usage_mb += host_memory_usage_mb
-                total_memory_capacity_mb += host_memory_capacity_mb
-                total_cpu_usage_mhz += host_cpu_usage_mhz
-                total_cpu_capacity_mhz += host_cpu_capacity_mhz
-
-            total_memory_usage_gb = total_memory_usage_mb / 1024  # Convert MB to GB
-            total_memory_capacity_gb = total_memory_capacity_mb / 1024  # Convert MB to GB
-            total_cpu_usage_ghz = total_cpu_usage_mhz / 1000  # Convert MHz to GHz
-            total_cpu_capacity_ghz = total_cpu_capacity_mhz / 1000  # Convert MHz to GHz
-
-            memory_load_percentage = (total_memory_usage_gb / total_memory_capacity_gb) * 100
-            cpu_load_percentage = (total_cpu_usage_ghz / total_cpu_capacity_ghz) * 100
-
-            return {
-                "vcenter_fqdn": service_instance._stub.host,  # vCenter FQDN
-                "vcenter_name": service_instance.content.about.name,  # vCenter name
-                "cluster_name": cluster.name,  # Cluster name
-                "hosts": host_data,
-                "total_used_gb": total_memory_usage_gb,
-                "total_capacity_gb": total_memory_capacity_gb,
-                "total_free_gb": total_memory_capacity_gb - total_memory_usage_gb,
-                "total_cpu_usage_ghz": total_cpu_usage_ghz,
-                "total_cpu_capacity_ghz": total_cpu_capacity_ghz,
-                "total_cpu_free_ghz": total_cpu_capacity_ghz - total_cpu_usage_ghz,
-                "memory_load_percentage": memory_load_percentage,
-                "cpu_load_percentage": cpu_load_percentage
-            }
+            metrics = build_cluster_metrics(raw_cluster)
+            if raw_data is not None:
+                raw_data["vcenter"][vcenter_id or f"{raw_cluster['vcenter_fqdn']}/{cluster.name}"] = raw_cluster
+            return metrics
         else:
             print(f"Cluster '{cluster_name}' not found.")
             return {}
@@ -136,31 +251,110 @@ def format_desktop_pool(pool):
     pool_name = pool.get('name', 'N/A')
     return pool_id, pool_name
 
-# Function to count machines by state in pool
-def count_machines_by_state_in_pool(session, server, pool_id):
-    machines_url = f"{server}{machines_endpoint}"
-    response = session.get(machines_url, verify=False)
-    
-    if response.status_code == 200:
-        machines = response.json()
-        state_counts = {state: 0 for state in states_to_count}
-        
-        for machine in machines:
-            if machine.get('desktop_pool_id') == pool_id:
-                state = machine.get('state')
-                if state in state_counts:
-                    state_counts[state] += 1
-        
-        return state_counts
+# Function to compile the pool filter rules into a single predicate
+def compile_pool_filter(rules):
+    def compile_patterns(patterns):
+        return re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE) if patterns else None
+
+    include_names = compile_patterns(rules.get("include_name_patterns", []))
+    exclude_names = compile_patterns(rules.get("exclude_name_patterns", []))
+    include_types = {pool_type.upper() for pool_type in rules.get("include_types", [])}
+    exclude_types = {pool_type.upper() for pool_type in rules.get("exclude_types", [])}
+
+    def pool_filter(pool):
+        pool_name = pool.get('name', 'N/A')
+        pool_type = str(pool.get('type', '')).upper()
+        if include_names and not include_names.search(pool_name):
+            return False
+        if exclude_names and exclude_names.search(pool_name):
+            return False
+        if include_types and pool_type not in include_types:
+            return False
+        if exclude_types and pool_type in exclude_types:
+            return False
+        return True
+
+    return pool_filter
+
+# Function to compile the pool grouping into a function returning a group name
+def compile_pool_grouper(grouping):
+    mode = grouping.get("mode")
+    if mode is None:
+        return None
+    if mode != "prefix":
+        raise ValueError(f"Unknown pool grouping mode: {mode!r}")
+    prefix_pattern = re.compile(grouping.get("prefix_pattern", r"^([^-_ ]+)"))
+    if prefix_pattern.groups < 1:
+        raise ValueError(f"Pool grouping prefix_pattern needs a capture group: {prefix_pattern.pattern!r}")
+
+    def pool_grouper(pool):
+        # Pools the pattern does not match stay as their own group
+        pool_name = pool.get('name', 'N/A')
+        match = prefix_pattern.search(pool_name)
+        return match.group(1) if match and match.group(1) else pool_name
+    return pool_grouper
+
+pool_filter = compile_pool_filter(pool_filter_rules)
+pool_grouper = compile_pool_grouper(pool_grouping)
+
+# Function to count machines by state for the given pools
+def count_machines_by_state_in_pools(machines, pool_ids):
+    all_state_counts = {pool_id: {state: 0 for state in states_to_count} for pool_id in pool_ids}
+
+    for machine in machines:
+        state_counts = all_state_counts.get(machine.get('desktop_pool_id'))
+        if state_counts is not None:
+            state = machine.get('state')
+            if state in state_counts:
+                state_counts[state] += 1
+
+    return all_state_counts
+
+# Function to filter, count and group raw desktop pools and machines into the
+# per-pool rows shown on the dashboard. Used by live collection and replay.
+def aggregate_pools(desktop_pools, machines):
+    server_data = []
+
+    # Filter first so discarded pools never reach the machine counts
+    selected_pools = [pool for pool in desktop_pools if pool_filter(pool)]
+    all_state_counts = count_machines_by_state_in_pools(
+        machines, [pool['id'] for pool in selected_pools if 'id' in pool])
+    # Pools without an id cannot match any machine, so they get their own zero counts
+    pool_state_counts = [
+        all_state_counts[pool['id']] if 'id' in pool else {state: 0 for state in states_to_count}
+        for pool in selected_pools
+    ]
+
+    if pool_grouper is None:
+        for pool, state_counts in zip(selected_pools, pool_state_counts):
+            _, pool_name = format_desktop_pool(pool)
+            server_data.append({
+                "pool_name": pool_name,
+                "state_counts": state_counts
+            })
     else:
-        return {state: 0 for state in states_to_count}
+        groups = {}
+        for pool, state_counts in zip(selected_pools, pool_state_counts):
+            group_name = pool_grouper(pool)
+            group = groups.setdefault(group_name, {
+                "pool_name": group_name,
+                "pool_count": 0,
+                "state_counts": {state: 0 for state in states_to_count}
+            })
+            group["pool_count"] += 1
+            for state, count in state_counts.items():
+                group["state_counts"][state] += count
+        server_data = list(groups.values())
+
+    return server_data
 
-# Function to fetch data from Horizon server
-def fetch_data_from_horizon_server(server, auth_data):
+# Function to fetch data from Horizon server; raw responses go into raw_data if given
+def fetch_data_from_horizon_server(server, auth_data, raw_data=None):
     auth_url = f"{server}{auth_endpoint}"
     desktop_pools_url = f"{server}{desktop_pools_endpoint}"
+    machines_url = f"{server}{machines_endpoint}"
 
-    session = requests.Session()
+    session = load_requests().Session()
     auth_response = session.post(auth_url, json=auth_data, verify=False)
 
     if auth_response.status_code == 200:
@@ -172,18 +366,19 @@ def fetch_data_from_horizon_server(server, auth_data):
             
             if response.status_code == 200:
                 desktop_pools = response.json()
-                server_data = []
-                
-                for pool in desktop_pools:
-                    pool_id, pool_name = format_desktop_pool(pool)
-                    if "test" not in pool_name.lower():
-                        state_counts = count_machines_by_state_in_pool(session, server, pool_id)
-                        server_data.append({
-                            "pool_name": pool_name,
-                            "state_counts": state_counts
-                        })
-                
-                return server_data
+                if raw_data is not None:
+                    raw_data["horizon"].setdefault(server, {})["desktop_pools"] = desktop_pools
+
+                # Skip the machines request entirely when every pool is filtered out
+                machines = []
+                if any(pool_filter(pool) for pool in desktop_pools):
+                    machines_response = session.get(machines_url, verify=False)
+                    if machines_response.status_code == 200:
+                        machines = machines_response.json()
+                        if raw_data is not None:
+                            raw_data["horizon"][server]["machines"] = machines
+
+                return aggregate_pools(desktop_pools, machines)
             else:
                 return [{"error": f"Failed to fetch pools (Status: {response.status_code})"}]
         else:
@@ -194,26 +389,242 @@ def fetch_data_from_horizon_server(server, auth_data):
     session.close()
 
 # Function to fetch all data from Horizon servers
-def fetch_all_horizon_server_data(auth_data):
+def fetch_all_horizon_server_data(auth_data, raw_data=None):
     print("Fetching fresh data from Horizon servers...")
     all_server_data = {}
     for server in horizon_servers:
-        all_server_data[server] = fetch_data_from_horizon_server(server, auth_data)
+        all_server_data[server] = fetch_data_from_horizon_server(server, auth_data, raw_data)
     return all_server_data, datetime.now()
 
 # Function to fetch all data from vCenter servers using the same service instances
-def fetch_all_vcenter_data(service_instance_1, service_instance_2):
+def fetch_all_vcenter_data(service_instance_1, service_instance_2, raw_data=None):
     print("Fetching fresh data from vCenter servers...")
     all_vcenter_data = {}
 
     if service_instance_1 and service_instance_2:
-        all_vcenter_data["vcenter1"] = get_cluster_performance_metrics(service_instance_1, vcenter_credentials["cluster_1"])
-        all_vcenter_data["vcenter2"] = get_cluster_performance_metrics(service_instance_2, vcenter_credentials["cluster_2"])
+        all_vcenter_data["vcenter1"] = get_cluster_performance_metrics(service_instance_1, vcenter_credentials["cluster_1"], raw_data, "vcenter1")
+        all_vcenter_data["vcenter2"] = get_cluster_performance_metrics(service_instance_2, vcenter_credentials["cluster_2"], raw_data, "vcenter2")
     else:
         print("Error: One or both vCenter sessions are not available.")
 
     return all_vcenter_data, datetime.now()
 
+# Function to encode a collection cycle as compact, gzip-compressed JSON
+def encode_snapshot(all_horizon_server_data, all_vcenter_data, fetch_time, raw_data=None):
+    snapshot = {
+        "fetch_time": fetch_time.strftime('%Y-%m-%d %H:%M:%S'),
+        "all_horizon_server_data": all_horizon_server_data,
+        "all_vcenter_data": all_vcenter_data
+    }
+    if raw_data is not None:
+        snapshot["raw_horizon"] = raw_data["horizon"]
+        snapshot["raw_vcenter"] = raw_data["vcenter"]
+    data = json.dumps(snapshot, separators=(',', ':')).encode('utf-8')
+    return gzip.compress(data, compresslevel=6)
+
+# Function to decode a snapshot produced by encode_snapshot
+def decode_snapshot(data):
+    snapshot = json.loads(gzip.decompress(data))
+    if not isinstance(snapshot, dict):
+        raise ValueError("snapshot is not a JSON object")
+    for key, expected_type in (("fetch_time", str), ("all_horizon_server_data", dict), ("all_vcenter_data", dict)):
+        if not isinstance(snapshot.get(key), expected_type):
+            raise ValueError(f"snapshot is missing a valid '{key}'")
+    snapshot["fetch_time"] = datetime.strptime(snapshot["fetch_time"], '%Y-%m-%d %H:%M:%S')
+    return snapshot
+
+# Function to write a collection cycle to a compressed snapshot file
+def write_snapshot(path, all_horizon_server_data, all_vcenter_data, fetch_time, raw_data=None):
+    data = encode_snapshot(all_horizon_server_data, all_vcenter_data, fetch_time, raw_data)
+    # Write to a temporary file first so readers never see a partial snapshot
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+    print(f"Snapshot written to {path}")
+
+# Function to load a snapshot file
+def load_snapshot(path):
+    with open(path, 'rb') as f:
+        return decode_snapshot(f.read())
+
+# Function to rebuild dashboard data from a snapshot's raw sections using the
+# current filter and grouping settings. Servers and clusters without raw data
+# fall back to the derived data stored in the snapshot.
+def rebuild_dashboard_data(snapshot):
+    raw_horizon = snapshot.get("raw_horizon") or {}
+    raw_vcenter = snapshot.get("raw_vcenter") or {}
+
+    all_horizon_server_data = dict(snapshot["all_horizon_server_data"])
+    for server, raw_server in raw_horizon.items():
+        if "desktop_pools" in raw_server:
+            all_horizon_server_data[server] = aggregate_pools(raw_server["desktop_pools"], raw_server.get("machines", []))
+
+    all_vcenter_data = dict(snapshot["all_vcenter_data"])
+    for vcenter_id, raw_cluster in raw_vcenter.items():
+        if vcenter_id in all_vcenter_data:
+            all_vcenter_data[vcenter_id] = build_cluster_metrics(raw_cluster)
+
+    return all_horizon_server_data, all_vcenter_data, snapshot["fetch_time"]
+
+# Function to collect dashboard data for a session, exporting a snapshot if enabled.
+# Raw backend results are captured only for the export, in a dict owned by this cycle.
+def collect_dashboard_data(session_data):
+    raw_data = {"horizon": {}, "vcenter": {}} if snapshot_export_path else None
+    all_horizon_server_data, _ = fetch_all_horizon_server_data(session_data["auth_data"], raw_data)
+    all_vcenter_data, fetch_time = fetch_all_vcenter_data(session_data["service_instance_1"], session_data["service_instance_2"], raw_data)
+    if snapshot_export_path:
+        try:
+            write_snapshot(snapshot_export_path, all_horizon_server_data, all_vcenter_data, fetch_time, raw_data)
+        except OSError as e:
+            print(f"Error writing snapshot: {e}")
+    return all_horizon_server_data, all_vcenter_data, fetch_time
+
+# Shared snapshot store backed by a SQLite file. SQLite's file locking makes it
+# safe to share between instances on the same host; it is not reliable on
+# network filesystems (NFS, SMB), so instances on several hosts need a
+# different store. Any object with the same three methods can be passed to
+# run_server as store= instead.
+class SQLiteSnapshotStore:
+    def __init__(self, path):
+        self.path = path
+        self.cached_version = None
+        self.cached_snapshot = None
+        db = self.connect()
+        try:
+            db.execute("CREATE TABLE IF NOT EXISTS collector_lease (id INTEGER PRIMARY KEY CHECK (id = 1), instance_id TEXT NOT NULL, expires_at REAL NOT NULL)")
+            db.execute("CREATE TABLE IF NOT EXISTS snapshot (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL, data BLOB NOT NULL)")
+        finally:
+            db.close()
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def try_acquire_lease(self, owner_id, lease_seconds):
+        # Take the collector lease if it is free, expired, or already ours
+        db = self.connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT instance_id, expires_at FROM collector_lease WHERE id = 1").fetchone()
+            now = time.time()
+            if row is None or row[0] == owner_id or row[1] < now:
+                db.execute("INSERT OR REPLACE INTO collector_lease (id, instance_id, expires_at) VALUES (1, ?, ?)", (owner_id, now + lease_seconds))
+                db.execute("COMMIT")
+                return True
+            db.execute("COMMIT")
+            return False
+        finally:
+            db.close()
+
+    def write_snapshot(self, owner_id, data):
+        # Only the current lease holder may publish, so a stalled former
+        # collector cannot overwrite newer data
+        db = self.connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT instance_id, expires_at FROM collector_lease WHERE id = 1").fetchone()
+            if row is None or row[0] != owner_id or row[1] < time.time():
+                db.execute("COMMIT")
+                return False
+            db.execute("INSERT INTO snapshot (id, version, data) VALUES (1, 1, ?) "
+                       "ON CONFLICT(id) DO UPDATE SET version = version + 1, data = excluded.data", (data,))
+            db.execute("COMMIT")
+            return True
+        finally:
+            db.close()
+
+    def read_snapshot(self):
+        # Decode only when the collector has published a new version
+        db = self.connect()
+        try:
+            row = db.execute("SELECT version FROM snapshot WHERE id = 1").fetchone()
+            if row is None:
+                return None
+            if row[0] != self.cached_version:
+                data_row = db.execute("SELECT version, data FROM snapshot WHERE id = 1").fetchone()
+                self.cached_snapshot = decode_snapshot(data_row[1])
+                self.cached_version = data_row[0]
+            return self.cached_snapshot
+        finally:
+            db.close()
+
+# Function to close any open vCenter sessions held in session data
+def disconnect_vcenter_sessions(session_data):
+    if not session_data:
+        return
+    _, connect = load_vcenter_stack()
+    for key in ("service_instance_1", "service_instance_2"):
+        if session_data.get(key):
+            try:
+                connect.Disconnect(session_data[key])
+            except Exception as e:
+                print(f"Error disconnecting from vCenter: {e}")
+
+# Function to run the collector loop; only the instance holding the lease collects
+def run_collector(collector_auth_data, interval_seconds):
+    lease_seconds = interval_seconds * 3
+    session_data = None
+    while True:
+        try:
+            if snapshot_store.try_acquire_lease(instance_id, lease_seconds):
+                if session_data is None:
+                    print(f"Instance {instance_id} elected as collector")
+                    vcenter_username = f"{collector_auth_data['domain']}\\{collector_auth_data['username']}" if collector_auth_data['domain'] else collector_auth_data['username']
+                    session_data = {
+                        "auth_data": collector_auth_data,
+                        "service_instance_1": connect_to_vcenter(vcenter_credentials["host_1"], vcenter_username, collector_auth_data["password"]),
+                        "service_instance_2": connect_to_vcenter(vcenter_credentials["host_2"], vcenter_username, collector_auth_data["password"])
+                    }
+                # Serving instances only use the derived data, so raw responses
+                # are kept out of the shared store
+                all_horizon_server_data, all_vcenter_data, fetch_time = collect_dashboard_data(session_data)
+                data = encode_snapshot(all_horizon_server_data, all_vcenter_data, fetch_time)
+                if not snapshot_store.write_snapshot(instance_id, data):
+                    print("Lost collector lease before publishing snapshot")
+                    disconnect_vcenter_sessions(session_data)
+                    session_data = None
+                elif not session_data["service_instance_1"] or not session_data["service_instance_2"]:
+                    # Reconnect to vCenter on the next cycle
+                    disconnect_vcenter_sessions(session_data)
+                    session_data = None
+            elif session_data is not None:
+                print(f"Instance {instance_id} is no longer the collector")
+                disconnect_vcenter_sessions(session_data)
+                session_data = None
+        except Exception as e:
+            if requests is not None and isinstance(e, requests.RequestException):
+                # A Horizon outage does not invalidate the vCenter sessions
+                print(f"Error contacting Horizon in collector loop: {e}")
+            else:
+                print(f"Error in collector loop: {e}")
+                disconnect_vcenter_sessions(session_data)
+                session_data = None
+        time.sleep(interval_seconds)
+
+# Function to create a signed, stateless session cookie value
+def create_signed_session(username):
+    payload = json.dumps({"user": username, "exp": int(time.time()) + session_lifetime_seconds}, separators=(',', ':'))
+    encoded = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+    signature = hmac.new(session_secret, encoded.encode('ascii'), hashlib.sha256).hexdigest()
+    return f"{encoded}.{signature}"
+
+# Function to verify a signed session cookie value; returns the payload or None
+def verify_signed_session(value):
+    if not value or '.' not in value:
+        return None
+    # Compare bytes so a malformed (e.g. non-ASCII) cookie is rejected, not raised
+    encoded, signature = value.encode('utf-8', 'surrogateescape').rsplit(b'.', 1)
+    expected = hmac.new(session_secret, encoded, hashlib.sha256).hexdigest().encode('ascii')
+    if not hmac.compare_digest(signature, expected):
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(encoded + b'=' * (-len(encoded) % 4)))
+    except ValueError:
+        return None
+    if not isinstance(payload, dict) or not isinstance(payload.get("exp"), (int, float)) or payload["exp"] < time.time():
+        return None
+    return payload
+
 class HTMLGenerator:
     def __init__(self, states_display_order):
         self.states_display_order = states_display_order
@@ -229,7 +640,8 @@ class HTMLGenerator:
                 if "error" in pool:
                     html += f'<p class="error-message">{pool["error"]}</p>'
                 else:
-                    html += f'<div class="pool-name">{pool["pool_name"]}</div>'
+                    pool_count = f' <span class="pool-count">({pool["pool_count"]} pools)</span>' if "pool_count" in pool else ''
+                    html += f'<div class="pool-name">{pool["pool_name"]}{pool_count}</div>'
                     html += '<div class="states-container">'
                     for state in self.states_display_order:
                         count = pool["state_counts"].get(state, 0)
@@ -378,6 +790,11 @@ class HTMLGenerator:
                     margin: 10px 0;
                     color: #333;
                 }}
+                .pool-count {{
+                    font-size: 12px;
+                    font-weight: normal;
+                    color: #777;
+                }}
                 .states-container {{
                     display: flex;
                     flex-wrap: wrap;
@@ -506,7 +923,8 @@ class HTMLGenerator:
                             if (pool.error) {{
                                 html += `<p class="error-message">${{pool.error}}</p>`;
                             }} else {{
-                                html += `<div class="pool-name">${{pool.pool_name}}</div>`;
+                                const poolCount = pool.pool_count !== undefined ? ` <span class="pool-count">(${{pool.pool_count}} pools)</span>` : '';
+                                html += `<div class="pool-name">${{pool.pool_name}}${{poolCount}}</div>`;
                                 html += '<div class="states-container">';
                                 for (const state of statesDisplayOrder) {{
                                     const count = pool.state_counts[state] || 0;
@@ -605,21 +1023,34 @@ class HTMLGenerator:
 
 
 class RequestHandler(BaseHTTPRequestHandler):
+    def get_dashboard_data(self):
+        # In replay mode every request re-runs aggregation on the loaded snapshot
+        if replay_snapshot is not None:
+            return rebuild_dashboard_data(replay_snapshot)
+        session_id = self.get_session_id()
+        # In shared store mode sessions are signed cookies and data comes from the store
+        if snapshot_store is not None:
+            if verify_signed_session(session_id) is None:
+                return None
+            snapshot = snapshot_store.read_snapshot()
+            if snapshot is None:
+                return {}, {}, datetime.now()
+            return snapshot["all_horizon_server_data"], snapshot["all_vcenter_data"], snapshot["fetch_time"]
+        if session_id in sessions:
+            return collect_dashboard_data(sessions[session_id])
+        return None
+
     def do_GET(self):
         html_gen = HTMLGenerator(states_display_order)
         if self.path == '/':
             # Check if the user is logged in
-            session_id = self.get_session_id()
-            if session_id in sessions:
+            dashboard_data = self.get_dashboard_data()
+            if dashboard_data is not None:
                 self.send_response(200)
                 self.send_header('Content-type', 'text/html')
                 self.end_headers()
-                auth_data = sessions[session_id]["auth_data"]
-                service_instance_1 = sessions[session_id]["service_instance_1"]
-                service_instance_2 = sessions[session_id]["service_instance_2"]
-                all_horizon_server_data, _ = fetch_all_horizon_server_data(auth_data)
-                all_vcenter_data, _ = fetch_all_vcenter_data(service_instance_1, service_instance_2)
-                html_content = html_gen.generate_dashboard_html(all_horizon_server_data, all_vcenter_data, datetime.now())
+                all_horizon_server_data, all_vcenter_data, fetch_time = dashboard_data
+                html_content = html_gen.generate_dashboard_html(all_horizon_server_data, all_vcenter_data, fetch_time)
                 self.wfile.write(html_content.encode())
             else:
                 self.send_response(200)
@@ -628,20 +1059,16 @@ class RequestHandler(BaseHTTPRequestHandler):
                 html_content = html_gen.generate_login_html()
                 self.wfile.write(html_content.encode())
         elif self.path == '/get_data':
-            session_id = self.get_session_id()
-            if session_id in sessions:
+            dashboard_data = self.get_dashboard_data()
+            if dashboard_data is not None:
                 self.send_response(200)
                 self.send_header('Content-type', 'application/json')
                 self.end_headers()
-                auth_data = sessions[session_id]["auth_data"]
-                service_instance_1 = sessions[session_id]["service_instance_1"]
-                service_instance_2 = sessions[session_id]["service_instance_2"]
-                all_horizon_server_data, _ = fetch_all_horizon_server_data(auth_data)
-                all_vcenter_data, _ = fetch_all_vcenter_data(service_instance_1, service_instance_2)
+                all_horizon_server_data, all_vcenter_data, fetch_time = dashboard_data
                 response_data = {
                     'server_data': all_horizon_server_data,
                     'vcenter_data': all_vcenter_data,
-                    'fetch_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    'fetch_time': fetch_time.strftime('%Y-%m-%d %H:%M:%S')
                 }
                 self.wfile.write(json.dumps(response_data).encode())
             else:
@@ -651,7 +1078,12 @@ class RequestHandler(BaseHTTPRequestHandler):
 
     def do_POST(self):
         html_gen = HTMLGenerator(states_display_order)
-        if self.path == '/login':
+        if self.path == '/login' and replay_snapshot is not None:
+            # No backends to log in to in replay mode
+            self.send_response(302)
+            self.send_header('Location', '/')
+            self.end_headers()
+        elif self.path == '/login':
             content_length = int(self.headers['Content-Length'])
             post_data = self.rfile.read(content_length).decode('utf-8')
             params = urllib.parse.parse_qs(post_data)
@@ -690,13 +1122,22 @@ class RequestHandler(BaseHTTPRequestHandler):
 
             # Check if both Horizon and vCenter logins are successful
             if not any("error" in item for item in test_result) and service_instance_1 and service_instance_2:
-                # Store the service instances in the session data
-                session_id = str(uuid.uuid4())
-                sessions[session_id] = {
-                    "auth_data": auth_data,
-                    "service_instance_1": service_instance_1,
-                    "service_instance_2": service_instance_2
-                }
+                if snapshot_store is not None:
+                    # Serving instances only read the shared store, so the
+                    # vCenter sessions opened for the login check are released
+                    disconnect_vcenter_sessions({
+                        "service_instance_1": service_instance_1,
+                        "service_instance_2": service_instance_2
+                    })
+                    session_id = create_signed_session(vcenter_username)
+                else:
+                    # Store the service instances in the session data
+                    session_id = str(uuid.uuid4())
+                    sessions[session_id] = {
+                        "auth_data": auth_data,
+                        "service_instance_1": service_instance_1,
+                        "service_instance_2": service_instance_2
+                    }
                 self.send_response(302)
                 self.send_header('Location', '/')
                 self.send_header('Set-Cookie', f'session_id={session_id}; HttpOnly; Path=/')
@@ -733,7 +1174,46 @@ def get_local_ip():
     except Exception:
         return "localhost"
 
-def run_server(port=2834):
+def run_server(port=2834, export_snapshot=None, replay=None, shared_store=None, collect_interval=60, store=None, warm_up=True):
+    global snapshot_export_path, replay_snapshot, snapshot_store, session_secret
+    snapshot_export_path = export_snapshot
+    if replay and (shared_store or store is not None):
+        print("Error: replay mode cannot be combined with a shared store.")
+        return
+    if store is None and shared_store:
+        try:
+            store = SQLiteSnapshotStore(shared_store)
+        except sqlite3.Error as e:
+            print(f"Error: cannot open shared store {shared_store}: {e}")
+            return
+    if replay:
+        # Serve the dashboard from a captured snapshot with no backends
+        try:
+            replay_snapshot = load_snapshot(replay)
+            # Run aggregation once up front so malformed raw sections fail here
+            rebuild_dashboard_data(replay_snapshot)
+        except (OSError, ValueError, EOFError, KeyError, TypeError, ZeroDivisionError) as e:
+            print(f"Error: cannot load snapshot {replay}: {e}")
+            return
+        print(f"Replay mode: serving snapshot {replay} captured at {replay_snapshot['fetch_time']}")
+    elif store is not None:
+        # All instances must share the same secret to accept each other's cookies
+        secret = os.environ.get("DASHBOARD_SESSION_SECRET")
+        if not secret:
+            print("Error: DASHBOARD_SESSION_SECRET must be set when using a shared store.")
+            return
+        session_secret = secret.encode('utf-8')
+        snapshot_store = store
+        # Instances without collector credentials only serve snapshots
+        collector_username = os.environ.get("COLLECTOR_USERNAME")
+        if collector_username:
+            collector_auth_data = {
+                "domain": os.environ.get("COLLECTOR_DOMAIN", ""),
+                "username": collector_username,
+                "password": os.environ.get("COLLECTOR_PASSWORD", "")
+            }
+            threading.Thread(target=run_collector, args=(collector_auth_data, collect_interval), daemon=True).start()
+        print(f"Shared store mode: {shared_store or type(store).__name__} (instance {instance_id})")
     server_address = ('0.0.0.0', port)  # Bind to all interfaces
     httpd = HTTPServer(server_address, RequestHandler)
     local_ip = get_local_ip()
@@ -742,8 +1222,27 @@ def run_server(port=2834):
     print(f"http://localhost:{port}")
     print(f"http://127.0.0.1:{port}")
     print("Click on any of the above links to open the page.")
+    startup_ms = (time.perf_counter() - startup_started_at) * 1000
+    peak_rss_mb = get_peak_rss_mb()
+    if peak_rss_mb is not None:
+        print(f"Startup completed in {startup_ms:.0f} ms (peak RSS {peak_rss_mb:.1f} MB)")
+    else:
+        print(f"Startup completed in {startup_ms:.0f} ms")
+    # Load the backend libraries off the request path so the first login is fast
+    if warm_up and not replay:
+        threading.Thread(target=warm_up_backends, daemon=True).start()
     httpd.serve_forever()
 
 if __name__ == '__main__':
-    run_server()
+    parser = argparse.ArgumentParser(description="VMware Horizon and vCenter monitoring dashboard")
+    parser.add_argument("--port", type=int, default=2834, help="Port to listen on")
+    parser.add_argument("--export-snapshot", metavar="FILE", help="Write each collection cycle to a compressed snapshot file")
+    # Replay serves a fixed snapshot, so it cannot be combined with a shared store
+    mode_group = parser.add_mutually_exclusive_group()
+    mode_group.add_argument("--replay", metavar="FILE", help="Serve the dashboard from a snapshot file without contacting any backend")
+    mode_group.add_argument("--shared-store", metavar="FILE", help="Share snapshots between instances on this host through a SQLite file; one elected instance collects")
+    parser.add_argument("--collect-interval", type=int, default=60, help="Seconds between collection cycles in shared store mode")
+    args = parser.parse_args()
+    run_server(args.port, export_snapshot=args.export_snapshot, replay=args.replay,
+               shared_store=args.shared_store, collect_interval=args.collect_interval)
 
@@ -0,0 +1,138 @@
+import unittest
+
+import Main
+
+
+def make_rules(**overrides):
+    rules = {
+        "include_name_patterns": [],
+        "exclude_name_patterns": [],
+        "include_types": [],
+        "exclude_types": []
+    }
+    rules.update(overrides)
+    return rules
+
+
+class PoolFilterTest(unittest.TestCase):
+    def test_default_rules_exclude_test_pools_like_before(self):
+        pool_filter = Main.compile_pool_filter(Main.pool_filter_rules)
+        for name in ["WIN10-Prod", "Finance", "Contest-Pool", "TEST-Win11", "win-test", "Testing"]:
+            with self.subTest(name=name):
+                # Previous behaviour: keep the pool unless "test" is in the lower-cased name
+                self.assertEqual(pool_filter({"name": name}), "test" not in name.lower())
+
+    def test_include_and_exclude_name_patterns(self):
+        pool_filter = Main.compile_pool_filter(make_rules(
+            include_name_patterns=[r"^win", r"^lnx"],
+            exclude_name_patterns=[r"-old$"]
+        ))
+        self.assertTrue(pool_filter({"name": "WIN10-Sales"}))
+        self.assertTrue(pool_filter({"name": "lnx-dev"}))
+        self.assertFalse(pool_filter({"name": "MAC-Design"}))
+        self.assertFalse(pool_filter({"name": "win10-old"}))
+
+    def test_include_and_exclude_types(self):
+        pool_filter = Main.compile_pool_filter(make_rules(include_types=["automated", "RDS"], exclude_types=["rds"]))
+        self.assertTrue(pool_filter({"name": "a", "type": "AUTOMATED"}))
+        self.assertFalse(pool_filter({"name": "b", "type": "RDS"}))
+        self.assertFalse(pool_filter({"name": "c", "type": "MANUAL"}))
+        self.assertFalse(pool_filter({"name": "d"}))
+
+    def test_empty_rules_keep_every_pool(self):
+        pool_filter = Main.compile_pool_filter(make_rules())
+        self.assertTrue(pool_filter({"name": "test"}))
+        self.assertTrue(pool_filter({}))
+
+
+class PoolGrouperTest(unittest.TestCase):
+    def test_no_mode_disables_grouping(self):
+        self.assertIsNone(Main.compile_pool_grouper({"mode": None}))
+
+    def test_prefix_groups_by_first_capture_group(self):
+        pool_grouper = Main.compile_pool_grouper({"mode": "prefix", "prefix_pattern": r"^([^-_ ]+)"})
+        self.assertEqual(pool_grouper({"name": "WIN10-Sales"}), "WIN10")
+        self.assertEqual(pool_grouper({"name": "LNX_dev"}), "LNX")
+
+    def test_unmatched_or_empty_group_keeps_pool_name(self):
+        pool_grouper = Main.compile_pool_grouper({"mode": "prefix", "prefix_pattern": r"^(WIN)?\d"})
+        self.assertEqual(pool_grouper({"name": "WIN1"}), "WIN")
+        self.assertEqual(pool_grouper({"name": "7zip"}), "7zip")
+        self.assertEqual(pool_grouper({"name": "Finance"}), "Finance")
+
+    def test_unknown_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            Main.compile_pool_grouper({"mode": "farms"})
+
+    def test_pattern_without_capture_group_is_rejected(self):
+        with self.assertRaises(ValueError):
+            Main.compile_pool_grouper({"mode": "prefix", "prefix_pattern": r"^WIN"})
+
+
+class AggregatePoolsTest(unittest.TestCase):
+    desktop_pools = [
+        {"id": "1", "name": "WIN-Sales", "type": "AUTOMATED"},
+        {"id": "2", "name": "WIN-Finance", "type": "AUTOMATED"},
+        {"id": "3", "name": "WIN-Test", "type": "AUTOMATED"},
+        {"id": "4", "name": "LNX-Dev", "type": "MANUAL"},
+        {"name": "WIN-NoId"},
+        {"name": "WIN-NoId2"}
+    ]
+    machines = [
+        {"desktop_pool_id": "1", "state": "AVAILABLE"},
+        {"desktop_pool_id": "1", "state": "CONNECTED"},
+        {"desktop_pool_id": "2", "state": "AVAILABLE"},
+        {"desktop_pool_id": "3", "state": "AVAILABLE"},
+        {"desktop_pool_id": "4", "state": "ERROR"},
+        {"desktop_pool_id": "4", "state": "UNKNOWN_STATE"},
+        {"desktop_pool_id": "N/A", "state": "AVAILABLE"},
+        {"state": "AVAILABLE"}
+    ]
+
+    def setUp(self):
+        self.previous_filter = Main.pool_filter
+        self.previous_grouper = Main.pool_grouper
+        Main.pool_filter = Main.compile_pool_filter(Main.pool_filter_rules)
+        Main.pool_grouper = None
+
+    def tearDown(self):
+        Main.pool_filter = self.previous_filter
+        Main.pool_grouper = self.previous_grouper
+
+    def test_counts_machines_per_pool_and_drops_filtered_pools(self):
+        server_data = Main.aggregate_pools(self.desktop_pools, self.machines)
+        by_name = {pool["pool_name"]: pool["state_counts"] for pool in server_data}
+        self.assertNotIn("WIN-Test", by_name)
+        self.assertEqual(by_name["WIN-Sales"]["AVAILABLE"], 1)
+        self.assertEqual(by_name["WIN-Sales"]["CONNECTED"], 1)
+        self.assertEqual(by_name["LNX-Dev"]["ERROR"], 1)
+        self.assertEqual(set(by_name["LNX-Dev"]), set(Main.states_to_count))
+
+    def test_pools_without_id_get_separate_zero_counts(self):
+        server_data = Main.aggregate_pools(self.desktop_pools, self.machines)
+        no_id_pools = [pool for pool in server_data if pool["pool_name"].startswith("WIN-NoId")]
+        self.assertEqual(len(no_id_pools), 2)
+        self.assertIsNot(no_id_pools[0]["state_counts"], no_id_pools[1]["state_counts"])
+        self.assertTrue(all(count == 0 for pool in no_id_pools for count in pool["state_counts"].values()))
+
+    def test_prefix_groups_sum_counts(self):
+        Main.pool_grouper = Main.compile_pool_grouper({"mode": "prefix", "prefix_pattern": r"^([^-_ ]+)"})
+        server_data = Main.aggregate_pools(self.desktop_pools, self.machines)
+        groups = {group["pool_name"]: group for group in server_data}
+        self.assertEqual(set(groups), {"WIN", "LNX"})
+        # WIN-Sales, WIN-Finance and the two id-less pools; WIN-Test is filtered out
+        self.assertEqual(groups["WIN"]["pool_count"], 4)
+        self.assertEqual(groups["WIN"]["state_counts"]["AVAILABLE"], 2)
+        self.assertEqual(groups["WIN"]["state_counts"]["CONNECTED"], 1)
+        self.assertEqual(groups["LNX"]["pool_count"], 1)
+        self.assertEqual(groups["LNX"]["state_counts"]["ERROR"], 1)
+
+    def test_count_machines_only_for_requested_pools(self):
+        counts = Main.count_machines_by_state_in_pools(self.machines, ["1", "4"])
+        self.assertEqual(set(counts), {"1", "4"})
+        self.assertEqual(counts["1"]["AVAILABLE"], 1)
+        self.assertEqual(counts["4"]["ERROR"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
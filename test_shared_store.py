@@ -0,0 +1,103 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime
+
+import Main
+
+
+class SignedSessionTest(unittest.TestCase):
+    def setUp(self):
+        self.previous_secret = Main.session_secret
+        Main.session_secret = b'test-secret'
+
+    def tearDown(self):
+        Main.session_secret = self.previous_secret
+
+    def test_valid_cookie_round_trips(self):
+        payload = Main.verify_signed_session(Main.create_signed_session('CORP\\alice'))
+        self.assertEqual(payload["user"], 'CORP\\alice')
+
+    def test_tampered_signature_is_rejected(self):
+        cookie = Main.create_signed_session('alice')
+        tampered = cookie[:-1] + ('0' if cookie[-1] != '0' else '1')
+        self.assertIsNone(Main.verify_signed_session(tampered))
+
+    def test_cookie_signed_with_another_secret_is_rejected(self):
+        cookie = Main.create_signed_session('alice')
+        Main.session_secret = b'other-secret'
+        self.assertIsNone(Main.verify_signed_session(cookie))
+
+    def test_expired_cookie_is_rejected(self):
+        previous_lifetime = Main.session_lifetime_seconds
+        Main.session_lifetime_seconds = -10
+        try:
+            cookie = Main.create_signed_session('alice')
+        finally:
+            Main.session_lifetime_seconds = previous_lifetime
+        self.assertIsNone(Main.verify_signed_session(cookie))
+
+    def test_non_ascii_cookie_is_rejected(self):
+        cookie = Main.create_signed_session('alice')
+        encoded, signature = cookie.rsplit('.', 1)
+        self.assertIsNone(Main.verify_signed_session('é' + cookie))
+        self.assertIsNone(Main.verify_signed_session(f"{encoded}.{signature[:-1]}é"))
+        self.assertIsNone(Main.verify_signed_session('\udcff.abc'))
+
+    def test_signed_non_dict_payload_is_rejected(self):
+        # Correctly signed, but the payload is the JSON list [1]
+        encoded = 'WzFd'
+        signature = Main.hmac.new(Main.session_secret, encoded.encode('ascii'), Main.hashlib.sha256).hexdigest()
+        self.assertIsNone(Main.verify_signed_session(f"{encoded}.{signature}"))
+
+    def test_missing_or_malformed_cookie_is_rejected(self):
+        self.assertIsNone(Main.verify_signed_session(None))
+        self.assertIsNone(Main.verify_signed_session(''))
+        self.assertIsNone(Main.verify_signed_session('no-signature'))
+
+
+class SQLiteSnapshotStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'store.db')
+        self.store_a = Main.SQLiteSnapshotStore(self.path)
+        self.store_b = Main.SQLiteSnapshotStore(self.path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def encode(self, pool_name):
+        return Main.encode_snapshot({"server": [{"pool_name": pool_name, "state_counts": {}}]}, {}, datetime.now())
+
+    def test_lease_held_by_another_instance_is_not_taken(self):
+        self.assertTrue(self.store_a.try_acquire_lease('a', 60))
+        self.assertFalse(self.store_b.try_acquire_lease('b', 60))
+        self.assertTrue(self.store_a.try_acquire_lease('a', 60))
+
+    def test_expired_lease_can_be_taken_over(self):
+        self.assertTrue(self.store_a.try_acquire_lease('a', -1))
+        self.assertTrue(self.store_b.try_acquire_lease('b', 60))
+
+    def test_only_lease_holder_can_publish(self):
+        self.assertTrue(self.store_a.try_acquire_lease('a', 60))
+        self.assertFalse(self.store_b.write_snapshot('b', self.encode('from-b')))
+        self.assertTrue(self.store_a.write_snapshot('a', self.encode('from-a')))
+        snapshot = self.store_b.read_snapshot()
+        self.assertEqual(snapshot["all_horizon_server_data"]["server"][0]["pool_name"], 'from-a')
+
+    def test_lapsed_lease_holder_cannot_publish(self):
+        self.assertTrue(self.store_a.try_acquire_lease('a', -1))
+        self.assertFalse(self.store_a.write_snapshot('a', self.encode('stale')))
+        self.assertIsNone(self.store_b.read_snapshot())
+
+    def test_reader_sees_new_versions(self):
+        self.assertTrue(self.store_a.try_acquire_lease('a', 60))
+        self.store_a.write_snapshot('a', self.encode('first'))
+        self.assertEqual(self.store_b.read_snapshot()["all_horizon_server_data"]["server"][0]["pool_name"], 'first')
+        self.store_a.write_snapshot('a', self.encode('second'))
+        self.assertEqual(self.store_b.read_snapshot()["all_horizon_server_data"]["server"][0]["pool_name"], 'second')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Upper bounds for a cold import of Main; generous enough for slow CI machines
+MAX_IMPORT_SECONDS = 2.0
+MAX_PEAK_RSS_MB = 100
+
+# Upper bound from process start to the first login page response
+MAX_FIRST_RESPONSE_SECONDS = 3.0
+
+# The lazy-import checks only prove something when the backends are installed
+BACKENDS_INSTALLED = all(importlib.util.find_spec(name) is not None for name in ("requests", "pyVmomi"))
+
+# Imports Main in a fresh interpreter and reports timing, RSS and loaded modules
+IMPORT_PROBE_SCRIPT = """
+import json, sys, time
+started_at = time.perf_counter()
+import Main
+import_seconds = time.perf_counter() - started_at
+print(json.dumps({
+    "import_seconds": import_seconds,
+    "peak_rss_mb": Main.get_peak_rss_mb(),
+    "loaded": [name for name in ("requests", "pyVmomi", "pyVim") if name in sys.modules]
+}))
+"""
+
+# Starts the server on a free port in a fresh interpreter and times the first
+# GET / (the login page). Warm-up is disabled so that any backend import seen
+# here was caused by serving the page itself.
+SERVER_PROBE_SCRIPT = """
+import io, json, socket, sys, threading, time, urllib.request
+from contextlib import redirect_stdout
+started_at = time.perf_counter()
+import Main
+with socket.socket() as s:
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+with redirect_stdout(io.StringIO()):
+    threading.Thread(target=Main.run_server, kwargs={"port": port, "warm_up": False}, daemon=True).start()
+    body = None
+    while body is None and time.perf_counter() - started_at < 30:
+        try:
+            body = urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=5).read().decode()
+        except OSError:
+            time.sleep(0.01)
+first_response_seconds = time.perf_counter() - started_at
+print(json.dumps({
+    "first_response_seconds": first_response_seconds,
+    "is_login_page": body is not None and 'action="/login"' in body,
+    "loaded": [name for name in ("requests", "pyVmomi", "pyVim") if name in sys.modules]
+}))
+"""
+
+
+def run_probe(script):
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class StartupTest(unittest.TestCase):
+    @unittest.skipUnless(BACKENDS_INSTALLED, "requests and pyVmomi are not installed")
+    def test_backend_libraries_are_not_imported_at_startup(self):
+        probe = run_probe(IMPORT_PROBE_SCRIPT)
+        self.assertEqual(probe["loaded"], [])
+
+    def test_import_time_and_rss_are_bounded(self):
+        probe = run_probe(IMPORT_PROBE_SCRIPT)
+        self.assertLess(probe["import_seconds"], MAX_IMPORT_SECONDS)
+        if probe["peak_rss_mb"] is not None:
+            self.assertLess(probe["peak_rss_mb"], MAX_PEAK_RSS_MB)
+
+    def test_login_page_is_served_quickly(self):
+        probe = run_probe(SERVER_PROBE_SCRIPT)
+        self.assertTrue(probe["is_login_page"])
+        self.assertLess(probe["first_response_seconds"], MAX_FIRST_RESPONSE_SECONDS)
+
+    @unittest.skipUnless(BACKENDS_INSTALLED, "requests and pyVmomi are not installed")
+    def test_login_page_does_not_load_backends(self):
+        probe = run_probe(SERVER_PROBE_SCRIPT)
+        self.assertTrue(probe["is_login_page"])
+        self.assertEqual(probe["loaded"], [])
+
+
+if __name__ == '__main__':
+    unittest.main()